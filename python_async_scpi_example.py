@@ -0,0 +1,208 @@
+# PPST - Concurrent SCPI queries to several Units via TCP/IP (asyncio)
+# Version: 1.0.0
+# Date: 12/03/2025
+
+import asyncio
+import sys
+import argparse
+import functools
+import logging
+
+# Default configuration
+DEFAULT_IP = "192.168.123.1"
+DEFAULT_PORT = 5025             # Standard SCPI port
+CONNECT_TIMEOUT = 2             # Connection timeout in seconds
+READ_TIMEOUT = 5                # Response timeout in seconds (measurement queries may be slow)
+ENCODE_CACHE_SIZE = 256         # Number of encoded commands kept in cache
+
+# Logger for the commands and responses, enabled with --verbose
+logger = logging.getLogger(__name__)
+
+# Queries sent to every Unit
+DEFAULT_QUERIES = ["*IDN?", "MEAS:VOLT?", "MEAS:FREQ?"]
+
+# Helper function to encode an SCPI command, reusing the bytes of repeated commands
+# The '\n' terminator is added once, when the command is first cached
+# Only the most recent commands are kept so long sessions or sweeps do not grow the cache
+# - command (str): SCPI command
+# Returns: tuple: (bytes: Command terminated with '\n', str: Command without the terminator)
+@functools.lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def _encode(command):
+    display = command.rstrip('\n')
+    return (display + '\n').encode(), display
+
+# Helper function to wait for user input before closing the script
+def wait_for_key_press(message="\nPress ENTER to close..."):
+    try:
+        input(message)
+    except:
+        pass
+
+# Class for asynchronous communication with SCPI Unit via TCP/IP
+# Several connections can wait for their responses at the same time in one event loop
+# - ip (str): Unit IP address
+# - port (int): TCP port (default: 5025)
+# - connect_timeout (int): Connection timeout in seconds
+# - read_timeout (int): Response timeout in seconds
+class AsyncSocketConnection:
+    def __init__(self, ip, port=DEFAULT_PORT, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.ip = ip
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.reader = None
+        self.writer = None
+
+    # Establish connection with the Unit
+    async def connect(self):
+        try:
+            # asyncio enables TCP_NODELAY on its TCP transports
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.ip, self.port), self.connect_timeout)
+            print(f"✓ Connected to {self.ip}:{self.port}")
+            return True
+        except asyncio.TimeoutError:
+            print(f"✗ Connection error ({self.ip}): timed out")
+            return False
+        except OSError as e:
+            print(f"✗ Connection error ({self.ip}): {e}")
+            return False
+
+    # Send an SCPI command to the Unit
+    # - command (str): SCPI command to send
+    async def send_command(self, command):
+        if self.writer is None:
+            print(f"✗ Error sending command ({self.ip}): not connected")
+            return
+        try:
+            encoded, display = _encode(command)
+            self.writer.write(encoded)
+            await self.writer.drain()
+            logger.debug("→ Sent (%s): %s", self.ip, display)
+        except OSError as e:
+            print(f"✗ Error sending command ({self.ip}): {e}")
+
+    # Send a query command and receive response
+    # - command (str): SCPI query command
+    # Returns: str: Unit response
+    async def query(self, command):
+        if self.writer is None:
+            print(f"✗ Query error ({self.ip}): not connected")
+            return None
+        try:
+            encoded, display = _encode(command)
+            self.writer.write(encoded)
+            await self.writer.drain()
+            # SCPI responses are terminated by '\n', read until the terminator
+            line = await asyncio.wait_for(self.reader.readuntil(b'\n'), self.read_timeout)
+            response = line.decode().strip()
+            logger.debug("← Response (%s) %s: %s", self.ip, display, response)
+            return response
+        except asyncio.TimeoutError:
+            # The late response would be taken as the response to the next query,
+            # so the connection can not be used anymore
+            print(f"✗ Query error ({self.ip}): timed out, closing the connection")
+            await self._close()
+            return None
+        except (OSError, asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError, UnicodeDecodeError) as e:
+            print(f"✗ Query error ({self.ip}): {e}")
+            return None
+
+    # Close connection with the Unit
+    async def disconnect(self):
+        if self.writer:
+            await self._close()
+            print(f"✓ Disconnected from {self.ip}")
+
+    # Close the stream and mark the connection as unusable
+    async def _close(self):
+        writer, self.writer = self.writer, None
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+# Send the same query to several Units at the same time
+# - connections (list): AsyncSocketConnection objects
+# - command (str): SCPI query command
+# Returns: list: Responses in the same order as the connections
+async def query_all(connections, command):
+    return await asyncio.gather(*(conn.query(command) for conn in connections))
+
+# Connect to all the Units, run the queries on all of them concurrently and disconnect
+async def run(ips, port, queries, read_timeout=READ_TIMEOUT):
+    connections = [AsyncSocketConnection(ip, port, read_timeout=read_timeout) for ip in ips]
+    connected = await asyncio.gather(*(conn.connect() for conn in connections))
+    active = [conn for conn, ok in zip(connections, connected) if ok]
+
+    try:
+        if not active:
+            return False
+        for command in queries:
+            print(f"\n→ Query: {command}")
+            responses = await query_all(active, command)
+            for conn, response in zip(active, responses):
+                if response is not None:
+                    print(f"← {conn.ip}: {response}")
+        return True
+    finally:
+        # Always disconnect at the end
+        await asyncio.gather(*(conn.disconnect() for conn in active))
+
+# Main script function
+def main():
+    # Configure command line arguments
+    parser = argparse.ArgumentParser(
+        description='Concurrent SCPI queries to several Units',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+            Usage examples:
+            python script.py --ip 192.168.1.100 192.168.1.101     # Query two Units
+            python script.py --query "*IDN?" "MEAS:CURR?"         # Specify different queries
+            python script.py --timeout 30                         # Wait longer for slow queries
+            python script.py --verbose                            # Show every command and response
+        """
+    )
+    parser.add_argument('--ip', type=str, nargs='+', default=[DEFAULT_IP], help=f'Instrument IP addresses (default: {DEFAULT_IP})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'TCP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--timeout', type=float, default=READ_TIMEOUT, help=f'Response timeout in seconds (default: {READ_TIMEOUT})')
+    parser.add_argument('--query', type=str, nargs='+', default=DEFAULT_QUERIES, help=f'SCPI queries to send (default: {" ".join(DEFAULT_QUERIES)})')
+    parser.add_argument('--verbose', action='store_true', help='Show every command and response sent')
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(format='%(message)s')
+        logger.setLevel(logging.DEBUG)
+
+    # Display connection information
+    print("============================================================")
+    print("CONCURRENT SCPI QUERIES - TCP/IP COMMUNICATION")
+    print("============================================================")
+    print(f"IP: {', '.join(args.ip)}")
+    print(f"Port: {args.port}")
+    print(f"Timeout: {args.timeout} s")
+    print("============================================================")
+
+    try:
+        if not asyncio.run(run(args.ip, args.port, args.query, args.timeout)):
+            print("\n✗ Could not establish connection. Verify:")
+            print("  - The equipment is powered on")
+            print("  - The IP address is correct")
+            print("  - The equipment is on the same network")
+            print("  - The firewall allows the connection")
+            wait_for_key_press()
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n✓ Program interrupted by user")
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+
+    print("\n✓ Program finished")
+    wait_for_key_press()
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,71 @@
 # Version: 1.0.0
 # Date: 12/03/2025
 
+import os
+import select
 import socket
 import sys
 import argparse
-import time
+import functools
+import logging
 
 # Default configuration
 DEFAULT_IP = "192.168.123.1"
 DEFAULT_PORT = 5025             # Standard SCPI port
-CONNECTION_TIMEOUT = 5          # Timeout in seconds
+CONNECT_TIMEOUT = 2             # Connection timeout in seconds
+READ_TIMEOUT = 1                # Response timeout in seconds
+OPERATION_TIMEOUT = 30          # Timeout in seconds for *OPC? (waits for the operations to finish)
+ENCODE_CACHE_SIZE = 256         # Number of encoded commands kept in cache
+SOCKET_BUFFER_SIZE = 1 << 20    # Send/receive socket buffer size in bytes (1 MiB)
+USER_TIMEOUT = 3000             # Time in milliseconds before an unresponsive connection is aborted
+
+# Logger for the commands and responses, enabled with --verbose
+logger = logging.getLogger(__name__)
+
+# Default socket options (level, option, value) applied before connecting
+# - TCP_NODELAY disables Nagle's algorithm so short SCPI commands are sent immediately
+# - SO_KEEPALIVE lets the OS detect a dead connection to the Unit
+DEFAULT_SOCKET_OPTIONS = [
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+]
+# - TCP_USER_TIMEOUT (Linux only) aborts the connection when sent data stays unacknowledged,
+#   instead of retrying for several minutes
+if hasattr(socket, 'TCP_USER_TIMEOUT'):
+    DEFAULT_SOCKET_OPTIONS.append((socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, USER_TIMEOUT))
+
+# Helper function to encode an SCPI command, reusing the bytes of repeated commands
+# The '\n' terminator is added once, when the command is first cached
+# Only the most recent commands are kept so long sessions or sweeps do not grow the cache
+# - command (str): SCPI command
+# Returns: tuple: (bytes: Command terminated with '\n', str: Command without the terminator)
+@functools.lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def _encode(command):
+    display = command.rstrip('\n')
+    return (display + '\n').encode(), display
+
+# Helper function to prepare SCPI commands to be joined with ';'
+# After a ';' the Unit keeps the path of the previous command, so a leading ':' is added
+# to every command after the first to make it start again from the root of the command tree
+# - commands (list): SCPI commands
+# Returns: list: Commands with the ':' prefix where needed
+def _from_root(commands):
+    return [commands[0]] + [c if c.startswith((':', '*')) else ':' + c for c in commands[1:]]
+
+# Helper function to split a compound response into the responses of each query
+# A ';' inside a quoted string (e.g. a SYST:ERR? message) does not separate responses
+# - response (str): Compound response
+# Returns: list: Responses, one per query
+def _split_responses(response):
+    responses, start, quoted = [], 0, False
+    for i, char in enumerate(response):
+        if char == '"':
+            quoted = not quoted
+        elif char == ';' and not quoted:
+            responses.append(response[start:i])
+            start = i + 1
+    responses.append(response[start:])
+    return responses
 
 # Helper function to wait for user input before closing the script
 def wait_for_key_press(message="\nPress ENTER to close..."):
@@ -22,55 +78,258 @@ def wait_for_key_press(message="\nPress ENTER to close..."):
 # Class for communication with SCPI Unit via TCP/IP
 # - ip (str): Unit IP address
 # - port (int): TCP port (default: 5025)
-# - timeout (int): Connection timeout in seconds
+# - connect_timeout (int): Connection timeout in seconds
+# - read_timeout (int): Response timeout in seconds
+# - socket_options (list): (level, option, value) tuples passed to setsockopt
+# - sndbuf (int): Socket send buffer size in bytes
+# - rcvbuf (int): Socket receive buffer size in bytes
 class SocketConnection:
-    def __init__(self, ip, port=DEFAULT_PORT, timeout=CONNECTION_TIMEOUT):
+    def __init__(self, ip, port=DEFAULT_PORT, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 socket_options=None, sndbuf=SOCKET_BUFFER_SIZE, rcvbuf=SOCKET_BUFFER_SIZE):
         self.ip = ip
         self.port = port
-        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.sndbuf = sndbuf
+        self.rcvbuf = rcvbuf
+        self.socket_options = DEFAULT_SOCKET_OPTIONS if socket_options is None else socket_options
         self.socket = None
+        self._fd = None
+        self._rbuf = bytearray(65536)
+        self._mv = memoryview(self._rbuf)
+        self._rlen = 0
+        self._outbuf = bytearray(4096)
 
     # Establish connection with the Unit
     def connect(self):
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(self.timeout)
+            for level, option, value in self.socket_options:
+                self.socket.setsockopt(level, option, value)
+            # Buffer sizes must be set before connecting so the TCP window scale is negotiated
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+            self.socket.settimeout(self.connect_timeout)
             self.socket.connect((self.ip, self.port))
+            self.socket.settimeout(self.read_timeout)
+            # Socket descriptors can not be used with os.write() on Windows
+            self._fd = self.socket.fileno() if sys.platform != 'win32' else None
+            self._rlen = 0
             print(f"✓ Connected to {self.ip}:{self.port}")
             return True
-        except Exception as e:
+        except (OSError, OverflowError, ValueError) as e:
+            # OverflowError/ValueError: invalid address or port (e.g. --port 70000)
             print(f"✗ Connection error: {e}")
             return False
 
     # Send an SCPI command to the Unit
     # - command (str): SCPI command to send
     def send_command(self, command):
+        encoded, display = _encode(command)
+        self._send_and_maybe_read(display, encoded, False)
+
+    # Write encoded data to the socket file descriptor, skipping the sendall() loop
+    # Falls back to sendall() for whatever a short write did not send
+    # - encoded (bytes): Data to send
+    def _write(self, encoded):
+        sent = 0
+        if self._fd is not None:
+            try:
+                sent = os.write(self._fd, encoded)
+            except BlockingIOError:
+                # The socket is non-blocking internally because it has a timeout
+                sent = 0
+        if sent < len(encoded):
+            self.socket.sendall(memoryview(encoded)[sent:])
+
+    # Send several SCPI commands in a single write, joined with ';'
+    # - commands (list): SCPI commands to send
+    def send_batch(self, commands):
+        if not commands:
+            return
+        commands = _from_root(commands)
         try:
-            if not command.endswith('\n'):
-                command += '\n'
-            self.socket.sendall(command.encode())
-            print(f"→ Sent: {command.strip()}")
-        except Exception as e:
-            print(f"✗ Error sending command: {e}")
+            self._check_connected()
+            self._send_outbuf(commands, ord(';'))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("→ Sent: %s", ';'.join(commands))
+        except OSError as e:
+            print(f"✗ Error sending commands: {e}")
+
+    # Copy the encoded commands into the reusable output buffer and send them in a single write
+    # - commands (list): SCPI commands to send
+    # - separator (int): Byte replacing each '\n' terminator except the last one, None to keep them
+    def _send_outbuf(self, commands, separator):
+        n = 0
+        for command in commands:
+            encoded = _encode(command)[0]
+            end = n + len(encoded)
+            if end > len(self._outbuf):
+                self._outbuf.extend(bytes(end - len(self._outbuf)))
+            self._outbuf[n:end] = encoded
+            if separator is not None:
+                self._outbuf[end - 1] = separator
+            n = end
+        self._outbuf[n - 1] = ord('\n')
+
+        view = memoryview(self._outbuf)[:n]
+        if hasattr(self.socket, 'sendmsg'):
+            while view:
+                view = view[self.socket.sendmsg([view]):]
+        else:
+            # sendmsg is not available on Windows
+            self.socket.sendall(view)
 
     # Send a query command and receive response
     # - command (str): SCPI query command
+    # - timeout (int): Response timeout in seconds for this query (default: read_timeout)
     # Returns: str: Unit response
-    def query(self, command):
+    def query(self, command, timeout=None):
+        encoded, display = _encode(command)
+        return self._send_and_maybe_read(display, encoded, True, timeout)
+
+    # Send several query commands in a single message and receive all the responses
+    # - commands (list): SCPI query commands
+    # Returns: list: Unit responses, one per query
+    def query_many(self, commands):
+        if not commands:
+            return []
+        command = ';'.join(_from_root(commands))
+        response = self.query(command)
+        if response is None:
+            return None
+        return _split_responses(response)
+
+    # Send several query commands as separate messages in a single write, then read all the responses
+    # The Unit answers the queries in order, so N queries cost one send and one wait
+    # instead of N round trips. Unlike query_many, each query gets its own response line.
+    # - commands (list): SCPI query commands
+    # Returns: list: Unit responses, one per query
+    def query_pipelined(self, commands):
+        if not commands:
+            return []
         try:
-            if not command.endswith('\n'):
-                command += '\n'
-            self.socket.sendall(command.encode())
-            print(f"→ Query: {command.strip()}")
-            response = self.socket.recv(65535).decode().strip()
-            print(f"← Response: {response}")
-            return response
-        except Exception as e:
+            self._check_connected()
+            self._drain()
+            self._send_outbuf(commands, None)
+            responses = [self._read_response() for _ in commands]
+            if logger.isEnabledFor(logging.DEBUG):
+                for command, response in zip(commands, responses):
+                    logger.debug("→ Query: %s", command)
+                    logger.debug("← Response: %s", response)
+            return responses
+        except (OSError, UnicodeDecodeError) as e:
             print(f"✗ Query error: {e}")
             return None
 
+    # Send an SCPI command, reading the response if it is a query (ends in '?')
+    # - command (str): SCPI command or query
+    # Returns: str: Unit response, None for commands without response
+    def dispatch(self, command):
+        encoded, display = _encode(command)
+        return self._send_and_maybe_read(display, encoded, encoded.endswith(b'?\n'))
+
+    # Send an encoded SCPI command and read the response if one is expected
+    # - command (str): SCPI command, used for display
+    # - encoded (bytes): Encoded command terminated with '\n'
+    # - expect_reply (bool): Read a response after sending
+    # - timeout (int): Response timeout in seconds (default: read_timeout)
+    # Returns: str: Unit response, None for commands without response
+    def _send_and_maybe_read(self, command, encoded, expect_reply, timeout=None):
+        try:
+            self._check_connected()
+            if expect_reply:
+                self._drain()
+            self._write(encoded)
+            if not expect_reply:
+                logger.debug("→ Sent: %s", command)
+                return None
+            logger.debug("→ Query: %s", command)
+            if timeout is not None:
+                self.socket.settimeout(timeout)
+            try:
+                response = self._read_response()
+            finally:
+                if timeout is not None:
+                    self.socket.settimeout(self.read_timeout)
+            logger.debug("← Response: %s", response)
+            return response
+        except (OSError, UnicodeDecodeError) as e:
+            if expect_reply:
+                print(f"✗ Query error: {e}")
+            else:
+                print(f"✗ Error sending command: {e}")
+            return None
+
+    # Receive one SCPI response (terminated by '\n') into the reusable receive buffer
+    # Data received after the terminator is kept in the buffer for the next response
+    # Returns: str: Unit response without the terminator
+    def _read_response(self):
+        start = 0
+        while True:
+            end = self._rbuf.find(b'\n', start, self._rlen)
+            if end >= 0:
+                response = str(self._mv[:end], 'utf-8').rstrip()
+                rest = self._rlen - end - 1
+                if rest:
+                    self._rbuf[:rest] = self._rbuf[end + 1:self._rlen]
+                self._rlen = rest
+                return response
+            start = self._rlen
+
+            # Grow the buffer for responses larger than its current size
+            if self._rlen == len(self._rbuf):
+                self._mv.release()
+                self._rbuf.extend(bytes(len(self._rbuf)))
+                self._mv = memoryview(self._rbuf)
+
+            n = self.socket.recv_into(self._mv[self._rlen:])
+            self._quickack()
+            if not n:
+                raise ConnectionError("Connection closed by the Unit")
+            self._rlen += n
+
+    # Read the data already received from the Unit without waiting for new data
+    # (e.g. messages the Unit sends on its own)
+    # Returns: str: Data received, empty if there is none
+    def read_available(self):
+        chunks = [self._mv[:self._rlen].tobytes()]
+        self._rlen = 0
+        while select.select([self.socket], [], [], 0)[0]:
+            n = self.socket.recv_into(self._mv)
+            if not n:
+                raise ConnectionError("Connection closed by the Unit")
+            chunks.append(self._mv[:n].tobytes())
+        return b''.join(chunks).decode(errors='replace')
+
+    # Discard data received but not read yet (e.g. a late response to a query that timed out)
+    # so it is not taken as the response to the next query. Does not wait for new data.
+    def _drain(self):
+        discarded = self._rlen
+        self._rlen = 0
+        while select.select([self.socket], [], [], 0)[0]:
+            n = self.socket.recv_into(self._mv)
+            if not n:
+                break
+            discarded += n
+        if discarded:
+            logger.debug("Discarded %d bytes of unread data", discarded)
+
+    # Raise ConnectionError if connect() was not called or the connection was closed
+    def _check_connected(self):
+        if self.socket is None or self.socket.fileno() < 0:
+            raise ConnectionError("Not connected to the Unit")
+
+    # Acknowledge received data immediately instead of waiting for delayed ACK
+    # TCP_QUICKACK is Linux only and is reset by the kernel, so re-arm it after every recv
+    def _quickack(self):
+        if hasattr(socket, 'TCP_QUICKACK'):
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
     # Close connection with the Unit
     def disconnect(self):
+        # The descriptor number may be reused once the socket is closed
+        self._fd = None
         if self.socket:
             self.socket.close()
             print(f"✓ Disconnected from {self.ip}")
@@ -78,23 +337,33 @@ class SocketConnection:
 # Basic example of AC voltage configuration, Frequency and Output ON
 def basic_configuration(socket):
     print("\n→ Starting basic configuration...")
-    time.sleep(2)  # Wait 2 seconds before executing
-    # Configure voltage mode to AC
-    socket.send_command("VOLT:MODE AC")
-    
-    # Configure AC voltage to 100V
-    socket.send_command("VOLT:AC 100")
+    # Check the Unit is ready to accept commands
+    idn = socket.query("*IDN?")
+    if idn is None:
+        print("✗ Unit is not responding")
+        return
+    print(f"✓ Unit: {idn}")
 
-    # Set frequency to 60 Hz
-    socket.send_command("FREQ 60")
+    # Send the whole configuration in one write:
+    # voltage mode AC, AC voltage 100V, frequency 60 Hz and output enabled
+    socket.send_batch(["VOLT:MODE AC", "VOLT:AC 100", "FREQ 60", "OUTP 1"])
 
-    # Enable output
-    socket.send_command("OUTP 1;")
-    socket.query(":*OPC?")
+    # Wait until the Unit has processed all the commands (e.g. the output ramp-up)
+    if socket.query("*OPC?", timeout=OPERATION_TIMEOUT) is None:
+        print("✗ Unit did not complete the configuration")
+        return
 
     # Query Volt and Frequency to verify settings
-    socket.query("MEAS:VOLT?")
-    socket.query("MEAS:FREQ?")
+    measurements = socket.query_many(["MEAS:VOLT?", "MEAS:FREQ?"])
+    if measurements and len(measurements) == 2:
+        print(f"← Voltage: {measurements[0]}")
+        print(f"← Frequency: {measurements[1]}")
+
+    # Read back the programmed setpoints, both queries sent in a single write
+    setpoints = socket.query_pipelined(["VOLT:AC?", "FREQ?"])
+    if setpoints:
+        print(f"← Voltage setpoint: {setpoints[0]}")
+        print(f"← Frequency setpoint: {setpoints[1]}")
 
     print("✓ Basic configuration completed\n")
 
@@ -109,12 +378,18 @@ def main():
             Usage examples:
             python script.py --ip 192.168.1.100       # Specify different IP
             python script.py --port 5025              # Specify different port
+            python script.py --verbose                # Show every command and response
         """
     )
     parser.add_argument('--ip', type=str, default=DEFAULT_IP, help=f'Instrument IP address (default: {DEFAULT_IP})')
     parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'TCP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--verbose', action='store_true', help='Show every command and response sent')
     args = parser.parse_args()
 
+    if args.verbose:
+        logging.basicConfig(format='%(message)s')
+        logger.setLevel(logging.DEBUG)
+
     # Display connection information
     print("============================================================")
     print("BASIC UNIT CONFIGURATION - TCP/IP COMMUNICATION")
@@ -4,67 +4,37 @@
 
 import sys
 import argparse
-import subprocess
-
-# Auto-install pyvisa and pyvisa-py if not available
-def install_dependencies():
-    """Check and install required packages"""
-    required_packages = ['pyvisa', 'pyvisa-py']
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
-            missing_packages.append(package)
-
-    if missing_packages:
-        print(f"Missing packages detected: {', '.join(missing_packages)}")
-        print("Attempting automatic installation...\n")
-
-        try:
-            # Try installation with suppressed output
-            result = subprocess.run(
-                [sys.executable, '-m', 'pip', 'install', '--user'] + missing_packages,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-
-            if result.returncode == 0:
-                print("✓ Packages installed successfully\n")
-                # Verify installation worked
-                for package in missing_packages:
-                    try:
-                        __import__(package.replace('-', '_'))
-                    except ImportError:
-                        print(f"✗ Installation succeeded but package {package} still not found")
-                        print("Try restarting the script or install manually")
-                        sys.exit(1)
-            else:
-                print(f"✗ Installation failed with return code {result.returncode}")
-                if result.stderr:
-                    print(f"Error details: {result.stderr[:500]}")
-                raise Exception("pip install failed")
-                
-        except Exception as e:
-            print(f"\n✗ Automatic installation failed: {e}")
-            print("\nPlease install manually using one of these methods:")
-            print(f"  • pip install pyvisa pyvisa-py")
-            print(f"  • pip3 install pyvisa pyvisa-py")
-            print(f"  • python3 -m pip install pyvisa pyvisa-py")
-            print(f"  • sudo apt install python3-pip && pip3 install pyvisa pyvisa-py")
-            sys.exit(1)
-
-# Install dependencies before importing pyvisa
-install_dependencies()
-
-import pyvisa
+import logging
+
+try:
+    import pyvisa
+except ImportError:
+    print("✗ PyVISA is not installed")
+    print("\nPlease install the dependencies using one of these methods:")
+    print("  • pip install -r requirements.txt")
+    print("  • pip install pyvisa pyvisa-py")
+    print("  • python3 -m pip install pyvisa pyvisa-py")
+    print("  • sudo apt install python3-pip && pip3 install pyvisa pyvisa-py")
+    sys.exit(1)
 
 # Default configuration
 DEFAULT_RESOURCE = "TCPIP0::192.168.123.1::inst0::INSTR"
 CONNECTION_TIMEOUT = 5000  # Timeout in milliseconds
 
+# Logger for the commands and responses, enabled with --verbose
+logger = logging.getLogger(__name__)
+
+# Shared VISA resource manager, created on first use
+_RM = None
+
+# Helper function to get the shared VISA resource manager
+# Creating a ResourceManager scans the VISA backends, so it is done only once
+def _get_rm():
+    global _RM
+    if _RM is None:
+        _RM = pyvisa.ResourceManager()
+    return _RM
+
 # Helper function to wait for user input before closing the script
 def wait_for_key_press(message="\nPress ENTER to close..."):
     try:
@@ -85,7 +55,7 @@ class VISAConnection:
     # Establish connection with the Unit
     def connect(self):
         try:
-            self.rm = pyvisa.ResourceManager()
+            self.rm = _get_rm()
             self.instrument = self.rm.open_resource(self.resource_string)
             self.instrument.timeout = self.timeout
             print(f"✓ Connected to {self.resource_string}")
@@ -99,7 +69,7 @@ class VISAConnection:
     def send_command(self, command):
         try:
             self.instrument.write(command)
-            print(f"→ Sent: {command.strip()}")
+            logger.debug("→ Sent: %s", command)
         except Exception as e:
             print(f"✗ Error sending command: {e}")
 
@@ -109,8 +79,8 @@ class VISAConnection:
     def query(self, command):
         try:
             response = self.instrument.query(command).strip()
-            print(f"→ Query: {command.strip()}")
-            print(f"← Response: {response}")
+            logger.debug("→ Query: %s", command)
+            logger.debug("← Response: %s", response)
             return response
         except Exception as e:
             print(f"✗ Query error: {e}")
@@ -121,8 +91,7 @@ class VISAConnection:
         if self.instrument:
             self.instrument.close()
             print(f"✓ Disconnected from {self.resource_string}")
-        if self.rm:
-            self.rm.close()
+        # The resource manager is shared and stays open for later connections
 
 def scpi_command(visa_conn):
     print("\nEnter SCPI commands directly. Type 'exit' to quit.")
@@ -139,7 +108,9 @@ def scpi_command(visa_conn):
 
             # If the command ends in '?', it's a query
             if command.endswith('?'):
-                visa_conn.query(command)
+                response = visa_conn.query(command)
+                if response is not None:
+                    print(response)
             else:
                 visa_conn.send_command(command)
 
@@ -161,6 +132,7 @@ Usage examples:
   python scpi_visa_example.py
   python scpi_visa_example.py --resource "TCPIP0::192.168.1.100::inst0::INSTR"
   python scpi_visa_example.py --resource "GPIB0::10::INSTR"
+  python scpi_visa_example.py --verbose
   
 Common VISA resource string formats:
   TCPIP: TCPIP0::<ip_address>::inst0::INSTR
@@ -171,8 +143,13 @@ Common VISA resource string formats:
                         help=f'VISA resource string (default: {DEFAULT_RESOURCE})')
     parser.add_argument('--timeout', type=int, default=CONNECTION_TIMEOUT,
                         help=f'Connection timeout in milliseconds (default: {CONNECTION_TIMEOUT})')
+    parser.add_argument('--verbose', action='store_true', help='Show every command and response sent')
     args = parser.parse_args()
 
+    if args.verbose:
+        logging.basicConfig(format='%(message)s')
+        logger.setLevel(logging.DEBUG)
+
     # Display connection information
     print("============================================================")
     print("SCPI COMMANDS - VISA COMMUNICATION")
@@ -197,6 +174,8 @@ Common VISA resource string formats:
         # Query instrument identification
         print("\nQuerying instrument identification...")
         idn = visa_conn.query("*IDN?")
+        if idn is not None:
+            print(f"✓ Unit: {idn}")
 
         # Start interactive command mode
         scpi_command(visa_conn)